@@ -1,5 +1,11 @@
-from gurobipy import Model, GRB, quicksum
+import hashlib
+import os
+import tempfile
+
+from gurobipy import Model, GRB, Env, GurobiError, MVar, hstack, read
 import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
 
 # --- 데이터 준비 (가정) ---
 # 항공기, 부품, 유지보수 슬롯, 날짜 설정
@@ -23,12 +29,21 @@ c_s = {s: 200 for s in S}  # 슬롯 배정 비용
 c_Ld = 50  # 임대된 부품 하루당 비용
 c_Lf = 200  # 새로 임대된 부품 비용
 
-# RUL 기반 고장 확률 (가정: 임의의 값)
-P_fail = {(a, c, d): min(0.1 * (d - d_0), 1.0) for a in A for c in C[a] for d in days}
+# --- 배열 형태의 인덱스 (모든 항공기의 부품/슬롯 집합이 동일하다고 가정) ---
+nA, nC, nS = len(A), len(C[A[0]]), len(S)
+if S != list(range(nS)) or not all(C[a] == list(range(nC)) and S_a[a] == S for a in A):
+    raise ValueError("배열 기반 모델은 모든 항공기에서 C[a] == range(nC), S_a[a] == S == range(nS)인 경우만 지원함")
+d_s_arr = np.array([d_s[s] for s in S])
+days_arr = np.array(days)
+# window[d, s] = 1 이면 날짜 d에 슬롯 s에서 교체된 부품이 수리 중
+window = (d_s_arr[None, :] <= days_arr[:, None]) & (days_arr[:, None] < d_s_arr[None, :] + Delta)
+
+# RUL 기반 고장 확률 (가정: 임의의 값), P_fail[a, c, d - d_0]
+P_fail = np.broadcast_to(np.minimum(0.1 * (days_arr - d_0), 1.0), (nA, nC, len(days)))
 # 설치 날짜 (가정: 모든 부품은 d_0에서 설치됨)
-d_install = {(a, c): 0 for a in A for c in C[a]}
+d_install = np.zeros((nA, nC))
 # 초기 예비 부품 재고 (가정)
-S_begin = {d: 2 for d in days}  # 각 날짜 시작 시 예비 부품 2개
+S_begin = np.full(len(days), 2)  # 각 날짜 시작 시 예비 부품 2개
 
 # 임계 항공기와 부품 조합 (가정)
 r = 0.5  # 신뢰도 임계값
@@ -36,96 +51,161 @@ A_r = [0]  # 항공기 0만 임계 항공기로 가정
 G_a = {0: [[0, 1], [1, 2], [2, 3]]}  # 항공기 0의 부품 조합 (최소 2개 작동 필요)
 d_r = {0: 5}  # 항공기 0의 AOG 위험 날짜 (가정)
 
-# --- Gurobi 모델 생성 ---
-model = Model("Aircraft_Maintenance_Planning")
 
-# --- 결정 변수 ---
-# X_acs: 부품 교체 여부
-X = model.addVars(
-    [(a, c, s) for a in A for c in C[a] for s in S_a[a]],
-    vtype=GRB.BINARY,
-    name="X"
-)
+def build_model():
+    """유지보수 계획 모델을 처음부터 생성한다 (캐시가 없을 때만 호출됨)."""
+    # --- Gurobi 모델 생성 ---
+    model = Model("Aircraft_Maintenance_Planning")
+
+    # --- 결정 변수 ---
+    # X_acs: 부품 교체 여부
+    X = model.addMVar((nA, nC, nS), vtype=GRB.BINARY, name="X")
+
+    # Y_as: 항공기 슬롯 배정 여부
+    Y = model.addMVar((nA, nS), vtype=GRB.BINARY, name="Y")
+
+    # L_d: 날짜 d의 임대 부품 수
+    L = model.addMVar(len(days), vtype=GRB.INTEGER, name="L")
+
+    # L_new_d: 날짜 d에 새로 임대된 부품 수
+    L_new = model.addMVar(len(days), vtype=GRB.INTEGER, name="L_new")
+
+    # --- 목적함수 ---
+    # 부품 교체 비용 계수 coef[a, c, s]
+    replace_coef = c_fix + P_fail[:, :, d_s_arr - d_0] * c_ex * (d_s_arr - d_install[:, :, None])
+    # 계획 기간 끝까지 교체를 미룰 때의 비용 계수 coef[a, c]
+    postpone_coef = c_fix + P_fail[:, :, PH] * c_ex * (d_0 + PH - d_install)
+
+    replace_cost = replace_coef.ravel() @ X.reshape(-1)
+    postpone_cost = postpone_coef.sum() - (postpone_coef[:, :, None] * X).sum()
+    # 슬롯 배정 비용
+    slot_cost = np.tile([c_s[s] for s in S], nA) @ Y.reshape(-1)
+    # 임대 부품 비용
+    lease_cost = c_Ld * L.sum() + c_Lf * L_new.sum()
+
+    # 총 비용
+    model.setObjective(replace_cost + postpone_cost + slot_cost + lease_cost, GRB.MINIMIZE)
+
+    # --- 제약조건 ---
+    # 1. Y_as >= X_acs (식 11), 집계하지 않고 부품별로 유지하여 LP 완화를 정수해로 유지
+    model.addConstr(Y[:, None, :] >= X, name="Y_geq_X")
+
+    # 2. Y_as <= sum(X_acs) (식 12)
+    model.addConstr(Y <= X.sum(axis=1), name="Y_leq_sumX")
+
+    # 3. 임대 부품 수 L_d (식 13)
+    # 모든 (a, c)에 대해 같은 window를 열 방향으로 반복한 뒤, [incidence | -I] @ [X; L] <= S_begin
+    repair_incidence = sp.kron(np.ones((1, nA * nC)), sp.csr_matrix(window, dtype=float))
+    model.addMConstr(
+        sp.hstack([repair_incidence, -sp.eye(len(days))], format="csr"),
+        hstack((X.reshape(-1), L)),
+        GRB.LESS_EQUAL,
+        S_begin,
+        name="L_d"
+    )
 
-# Y_as: 항공기 슬롯 배정 여부
-Y = model.addVars(
-    [(a, s) for a in A for s in S_a[a]],
-    vtype=GRB.BINARY,
-    name="Y"
-)
+    # 4. 새로 임대된 부품 L_new_d (식 14, 15)
+    model.addConstr(L_new[1:] >= L[1:] - L[:-1], name="L_new_d")
+    model.addConstr(
+        L_new[0] >= L[0],  # 계획 시작 전 날짜(d_0 - 1)의 재고는 0으로 간주
+        name="L_new_d0"
+    )
 
-# L_d: 날짜 d의 임대 부품 수
-L = model.addVars(days, vtype=GRB.INTEGER, name="L")
+    # 5. 항공기당 최대 하나의 슬롯 (식 17)
+    model.addConstr(Y.sum(axis=1) <= 1, name="One_slot")
 
-# L_new_d: 날짜 d에 새로 임대된 부품 수
-L_new = model.addVars(days, vtype=GRB.INTEGER, name="L_new")
+    # 6. 슬롯 용량 제한 (식 18)
+    model.addConstr(Y.sum(axis=0) <= np.array([m_s[s] for s in S]), name="Slot_capacity")
 
-# --- 목적함수 ---
-# 부품 교체 비용
-replace_cost = quicksum(
-    X[a, c, s] * (c_fix + P_fail[a, c, d_s[s]] * c_ex * (d_s[s] - d_install[a, c]))
-    for a in A for c in C[a] for s in S_a[a]
-)
-postpone_cost = quicksum(
-    (1 - quicksum(X[a, c, s] for s in S_a[a])) * (
-        c_fix + P_fail[a, c, d_0 + PH] * c_ex * (d_0 + PH - d_install[a, c])
-    )
-    for a in A for c in C[a]
-)
-# 슬롯 배정 비용
-slot_cost = quicksum(Y[a, s] * c_s[s] for a in A for s in S_a[a])
-# 임대 부품 비용
-lease_cost = quicksum(L[d] * c_Ld + L_new[d] * c_Lf for d in days)
-
-# 총 비용
-model.setObjective(replace_cost + postpone_cost + slot_cost + lease_cost, GRB.MINIMIZE)
-
-# --- 제약조건 ---
-# 1. Y_as >= X_acs (식 11)
-for a in A:
-    for c in C[a]:
-        for s in S_a[a]:
-            model.addConstr(Y[a, s] >= X[a, c, s], name=f"Y_geq_X_{a}_{c}_{s}")
-
-# 2. Y_as <= sum(X_acs) (식 12)
-for a in A:
-    for s in S_a[a]:
-        model.addConstr(Y[a, s] <= quicksum(X[a, c, s] for c in C[a]), name=f"Y_leq_sumX_{a}_{s}")
-
-# 3. 임대 부품 수 L_d (식 13)
-for d in days:
-    replaced_components = quicksum(
-        X[a, c, s] for a in A for c in C[a] for s in S_a[a]
-        if d_s[s] <= d < d_s[s] + Delta
-    )
-    model.addConstr(L[d] >= replaced_components - S_begin[d], name=f"L_d_{d}")
-    model.addConstr(L[d] >= 0, name=f"L_d_nonneg_{d}")
-
-# 4. 새로 임대된 부품 L_new_d (식 14, 15)
-for d in days[1:]:
-    model.addConstr(L_new[d] >= L[d] - L[d-1], name=f"L_new_d_{d}")
-    model.addConstr(L_new[d] >= 0, name=f"L_new_d_nonneg_{d}")
-model.addConstr(
-    L_new[d_0] >= L[d_0] - max(0, S_begin.get(d_0 - 1, 0)),
-    name="L_new_d0"
-)
+    # 7. AOG 방지 제약 (식 19, 간소화된 선형화)
+    for a in A_r:
+        before_risk = d_s_arr < d_r[a]  # d_r[a] 이전에 열리는 슬롯
+        for g in G_a[a]:
+            # 적어도 하나의 조합 g의 모든 부품이 d_r[a] 전에 교체되어야 함
+            model.addConstr(
+                X[a, g][:, before_risk].sum() >= len(g),
+                name=f"AOG_prevent_{a}_{'_'.join(map(str, g))}"
+            )
 
-# 5. 항공기당 최대 하나의 슬롯 (식 17)
-for a in A:
-    model.addConstr(quicksum(Y[a, s] for s in S_a[a]) <= 1, name=f"One_slot_{a}")
-
-# 6. 슬롯 용량 제한 (식 18)
-for s in S:
-    model.addConstr(quicksum(Y[a, s] for a in A) <= m_s[s], name=f"Slot_capacity_{s}")
-
-# 7. AOG 방지 제약 (식 19, 간소화된 선형화)
-for a in A_r:
-    for g in G_a[a]:
-        # 적어도 하나의 조합 g의 모든 부품이 d_r[a] 전에 교체되어야 함
-        model.addConstr(
-            quicksum(X[a, c, s] for c in g for s in S_a[a] if d_s[s] < d_r[a]) >= len(g),
-            name=f"AOG_prevent_{a}_{g}"
+    # 8. 대칭성 제거: AOG 조합이 없고 비용 계수가 모두 같은 항공기의 부품은 서로 바꿔도 동일하므로
+    #    교체 순서를 부품 번호 순으로 고정 (그 외에는 Params.Symmetry에만 의존)
+    for a in A:
+        identical = (
+            np.allclose(replace_coef[a], replace_coef[a, :1])
+            and np.allclose(postpone_coef[a], postpone_coef[a, 0])
         )
+        if a not in A_r and identical:
+            model.addConstr(X[a, :-1].sum(axis=1) >= X[a, 1:].sum(axis=1), name=f"Symmetry_{a}")
+
+    model.update()
+    return model
+
+
+# --- 모델 캐시: 스크립트(입력 데이터와 build_model 코드)가 같으면 저장된 MPS 파일을 다시 읽어 생성 과정을 생략 ---
+# 스크립트를 수정할 때마다 새로운 cache_<hash>.mps가 생기며, 이전 캐시 파일은 자동으로 지워지지 않음
+with open(__file__, "rb") as f:
+    cache_key = hashlib.sha256(f.read()).hexdigest()[:16]
+cache_dir = os.environ.get("MODEL_CACHE_DIR", os.path.dirname(os.path.abspath(__file__)))
+cache_path = os.path.join(cache_dir, f"cache_{cache_key}.mps")
+if os.path.exists(cache_path):
+    model = read(cache_path, Env(params={"OutputFlag": 0}))
+else:
+    model = build_model()
+    # 캐시는 최적화일 뿐이므로 저장에 실패해도(읽기 전용 디렉터리 등) 새로 생성한 모델로 계속 진행
+    try:
+        # 중단된 실행이 불완전한 캐시를 남기지 않도록 임시 파일에 쓴 뒤 교체
+        fd, tmp_path = tempfile.mkstemp(prefix="cache_", suffix=".tmp.mps", dir=cache_dir)
+        os.close(fd)
+        try:
+            model.write(tmp_path)
+            os.replace(tmp_path, cache_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    except (OSError, GurobiError) as e:
+        print(f"모델 캐시 저장 실패, 캐시 없이 진행: {e}")
+
+# MPS 파일에 저장된 변수 이름(X[a,c,s] 등)으로 MVar를 복원
+all_vars = model.getVars()
+var_by_name = dict(zip(model.getAttr("VarName", all_vars), all_vars))
+X = MVar.fromlist([[[var_by_name[f"X[{a},{c},{s}]"] for s in S] for c in C[a]] for a in A])
+Y = MVar.fromlist([[var_by_name[f"Y[{a},{s}]"] for s in S] for a in A])
+L = MVar.fromlist([var_by_name[f"L[{d - d_0}]"] for d in days])
+L_new = MVar.fromlist([var_by_name[f"L_new[{d - d_0}]"] for d in days])
+
+# --- 솔버 파라미터 ---
+model.Params.OutputFlag = 0  # 이후 파라미터 설정 로그도 출력하지 않도록 가장 먼저 설정
+model.Params.Symmetry = 2  # 공격적인 대칭성 탐지
+# 소규모 MIP이므로 무거운 절단평면 대신 빠른 탐색에 집중
+model.Params.MIPFocus = 1  # 실행 가능해 우선
+model.Params.Cuts = 1  # 보수적인 절단평면 생성
+model.Params.Presolve = 2  # 공격적인 전처리
+model.Params.Threads = 1  # 작은 LP에서 스레드 생성 비용 회피
+
+# --- LP 완화 (HiGHS) 해를 보정하여 MIP 시작해로 사용 ---
+A_mat = model.getA()
+sense = np.array(model.getAttr("Sense", model.getConstrs()))
+rhs = np.array(model.getAttr("RHS", model.getConstrs()))
+# Gurobi의 >= 제약은 부호를 바꾸어 <= 형태로 변환
+sign = np.where(sense == GRB.GREATER_EQUAL, -1.0, 1.0)
+ub_rows = sense != GRB.EQUAL
+lp = linprog(
+    model.getAttr("Obj", all_vars),
+    A_ub=sp.diags(sign[ub_rows]) @ A_mat[ub_rows],
+    b_ub=sign[ub_rows] * rhs[ub_rows],
+    A_eq=A_mat[~ub_rows],
+    b_eq=rhs[~ub_rows],
+    bounds=list(zip(model.getAttr("LB", all_vars), model.getAttr("UB", all_vars))),
+    method="highs",
+)
+if lp.success:
+    # X만 LP 해에서 반올림하고, 나머지 변수는 X와 일치하도록 다시 계산
+    x_start = np.round(lp.x[[v.index for v in X.reshape(-1).tolist()]]).reshape(X.shape)
+    l_start = np.maximum(window @ x_start.sum(axis=(0, 1)) - S_begin, 0)
+    X.Start = x_start
+    Y.Start = x_start.sum(axis=1) > 0
+    L.Start = l_start
+    L_new.Start = np.maximum(l_start - np.concatenate(([0], l_start[:-1])), 0)
 
 # --- 모델 최적화 ---
 model.optimize()
@@ -134,17 +214,20 @@ model.optimize()
 if model.status == GRB.OPTIMAL:
     print("최적 해 발견!")
     print(f"목적함수 값: {model.objVal}")
+    # 해 값을 한 번에 NumPy 배열로 가져옴
+    y_vals, x_vals = Y.X, X.X
+    l_vals, l_new_vals = L.X, L_new.X
     for a in A:
         for s in S_a[a]:
-            if Y[a, s].x > 0.5:
+            if y_vals[a, s] > 0.5:
                 print(f"항공기 {a}가 슬롯 {s}에 배정됨")
             for c in C[a]:
-                if X[a, c, s].x > 0.5:
+                if x_vals[a, c, s] > 0.5:
                     print(f"항공기 {a}의 부품 {c}가 슬롯 {s}에서 교체됨")
     for d in days:
-        if L[d].x > 0:
-            print(f"날짜 {d}에 임대된 부품 수: {L[d].x}")
-        if L_new[d].x > 0:
-            print(f"날짜 {d}에 새로 임대된 부품 수: {L_new[d].x}")
+        if l_vals[d - d_0] > 0:
+            print(f"날짜 {d}에 임대된 부품 수: {l_vals[d - d_0]}")
+        if l_new_vals[d - d_0] > 0:
+            print(f"날짜 {d}에 새로 임대된 부품 수: {l_new_vals[d - d_0]}")
 else:
     print("최적 해를 찾지 못함")
\ No newline at end of file